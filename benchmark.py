@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Benchmark the rendering pipeline of flying donut (headless, no console output).
+
+For more information, see README.
+
+For usage, run <python3 benchmark.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/14"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import time
+import curses
+import tracemalloc
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    # Optional, fused kernel is skipped
+    numba = None
+
+from utils.geom import base, donut, rotations, rotate, shades, pixels, step
+from utils.pool import buffer
+from utils.console import frame, resize, pause, cells, encode, grays, render
+
+
+##########################
+###### USER INPUTS #######
+##########################
+X,Y,Z = base()
+R1 = 1
+R2 = 2
+n_theta = 100
+n_phi = 500
+spotlight = [0,2,10]
+zoom = 1.0
+speed = 0.5
+speed_ratio = 3/7
+
+frame_height = 40
+frame_width = 2*frame_height
+n_frames = 50
+
+char = [" ", ".", ",", "-", "~", ":", ";", "=", "!", "*", "#", "$", "@"]
+modes = ['ascii', 'halfblock', 'braille']
+ditherings = [None, 'bayer', 'diffusion']
+
+# Console sizes (rows,columns) picked at random on every frame to emulate resizes
+# The smallest one can't fit any image, rendering is paused until next resize
+resize_sizes = [(40,80),(24,48),(30,60),(12,24),(1,1)]
+n_resize_frames = 200
+
+# Point counts (n_theta,n_phi) used to compare the fused kernel to the NumPy pipeline
+kernel_points = [(50,100),(100,500),(200,1000)]
+
+
+def run(mode,dithering):
+    """Render frames headless for a given output mode and dithering method.
+
+    Args:
+        mode (str): Output mode (see utils.console.cells).
+        dithering (str): Dithering method (see utils.console.dither).
+
+    Returns:
+        fps (float): Frames per second for the whole pipeline.
+        encode_time (float): Mean time in milliseconds spent converting a frame to characters.
+    """
+    M_donut, V_normals, _ = donut(R1,R2,X,Z,n_theta,Y,n_phi)
+    movement_rotations = rotations(X,speed,Z,speed_ratio*speed)
+    cell_rows, cell_columns = cells(mode)
+    image_height = cell_rows*frame_height
+    image_width = cell_columns*frame_width
+
+    encode_time = 0
+    start = time.perf_counter()
+    for _ in range(n_frames):
+        M_donut = rotate(M_donut,movement_rotations)
+        V_normals = rotate(V_normals,movement_rotations)
+        rotated_shades, light_indexes = shades(M_donut,V_normals,spotlight)
+        M_pixels = pixels(M_donut,rotated_shades,light_indexes,
+                            image_height,image_width,2*(R1+R2),zoom)
+        encode_start = time.perf_counter()
+        M_characters = encode(M_pixels,mode,char,dithering)
+        M_colors = grays(M_pixels,24,(cell_rows,cell_columns))
+        encode_time += time.perf_counter()-encode_start
+    elapsed = time.perf_counter()-start
+
+    return n_frames/elapsed, 1000*encode_time/n_frames
+
+
+class Console():
+    """Stub of a curses screen, the console is resized every time keys are read.
+    When keys are read in blocking mode (i.e. rendering is paused) a resize always happens.
+    Like curses, writing outside the screen or in the bottom-right cell raises an error.
+    """
+
+    def __init__(self,sizes):
+        self.sizes = iter(sizes)
+        self.size = next(self.sizes)
+        self.blocking = False
+        self.pending = False
+
+    def getch(self):
+        if self.pending or self.blocking:
+            self.pending = False
+            self.size = next(self.sizes)
+            return curses.KEY_RESIZE
+        return -1
+
+    def getmaxyx(self):
+        return self.size
+
+    def nodelay(self,flag):
+        self.blocking = not flag
+
+    def clear(self):
+        pass
+
+    def addstr(self,y,x,text,attr=0):
+        rows, columns = self.size
+        if y >= rows or x+len(text) > columns or (y == rows-1 and x+len(text) == columns):
+            raise curses.error('addwstr() returned ERR')
+
+    def refresh(self):
+        pass
+
+
+def thrash(mode,use_pool,trace=False):
+    """Render frames headless while the console is resized on every frame.
+    Resizes and rendering go through utils.console.resize, frame, pause and render like in donut.py.
+
+    Args:
+        mode (str): Output mode (see utils.console.cells).
+        use_pool (bool): Reuse frame and character buffers from a pool (see utils.console.buffer).
+        trace (bool, optional): Measure memory allocated on each frame with tracemalloc (slows frames down). Defaults to False.
+
+    Returns:
+        frame_times (array[float]): Time in milliseconds spent on each frame.
+        allocations (array[float]): Memory in KB newly held by frame and character buffers on each frame (empty if trace is False).
+    """
+    M_donut, V_normals, _ = donut(R1,R2,X,Z,n_theta,Y,n_phi)
+    movement_rotations = rotations(X,speed,Z,speed_ratio*speed)
+    cell_rows, cell_columns = cells(mode)
+    # Plenty of sizes since pauses consume several of them
+    sizes = np.random.default_rng(0).integers(len(resize_sizes),size=10*n_resize_frames)
+    scr = Console([resize_sizes[size] for size in sizes])
+    frame_height,frame_width = frame(scr,-1)
+
+    pool = {} if use_pool else None
+    frame_times = []
+    allocations = []
+    if trace:
+        tracemalloc.start()
+        # Warm up so that one-time allocations (module caches, points moved to traced memory) are not counted
+        M_donut = rotate(M_donut,movement_rotations)
+        V_normals = rotate(V_normals,movement_rotations)
+        rotated_shades, light_indexes = shades(M_donut,V_normals,spotlight)
+        encode(pixels(M_donut,rotated_shades,light_indexes,cell_rows,cell_columns,2*(R1+R2),zoom),mode,char)
+        del rotated_shades, light_indexes
+    for k in range(n_resize_frames):
+        scr.pending = True
+        if trace:
+            allocated = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        if resize(scr):
+            frame_height,frame_width = frame(scr,-1)
+            if not frame_height:
+                frame_height,frame_width = pause(scr,-1)
+        image_height = cell_rows*frame_height
+        image_width = cell_columns*frame_width
+        M_donut = rotate(M_donut,movement_rotations)
+        V_normals = rotate(V_normals,movement_rotations)
+        rotated_shades, light_indexes = shades(M_donut,V_normals,spotlight)
+        out = buffer(pool,(image_height,image_width)) if use_pool else None
+        M_pixels = pixels(M_donut,rotated_shades,light_indexes,
+                            image_height,image_width,2*(R1+R2),zoom,out)
+        M_characters = encode(M_pixels,mode,char,None,pool)
+        render(M_characters,scr,k,n_resize_frames)
+        frame_times.append(1000*(time.perf_counter()-start))
+        # Only frame and character buffers are still held here, previous ones have been released
+        # (fresh buffers are counted on every frame, pooled buffers only when first allocated)
+        del rotated_shades, light_indexes
+        if trace:
+            allocations.append((tracemalloc.get_traced_memory()[0]-allocated)/1024)
+        del M_pixels, M_characters
+    if trace:
+        tracemalloc.stop()
+
+    return np.array(frame_times), np.array(allocations)
+
+
+def kernel(n_theta,n_phi,jit):
+    """Time the rotate/shade/project steps only (see utils.geom.step).
+
+    Args:
+        n_theta (int): Number of points along the inner circle.
+        n_phi (int): Number of points along the outer circle.
+        jit (bool): Use the fused kernel.
+
+    Returns:
+        step_time (float): Mean time in milliseconds spent on a frame.
+        M_frames (array[float]): Every rendered frame (shape is (n_frames,frame_height,frame_width)).
+    """
+    M_donut, V_normals, _ = donut(R1,R2,X,Z,n_theta,Y,n_phi)
+    movement_rotations = rotations(X,speed,Z,speed_ratio*speed)
+    # Warm up (Numba compilation happens on first call)
+    step(M_donut,V_normals,movement_rotations,spotlight,frame_height,frame_width,2*(R1+R2),zoom,jit=jit)
+
+    # Same buffer pool as donut.py
+    pool = {}
+    M_frames = np.empty((n_frames,frame_height,frame_width))
+    start = time.perf_counter()
+    for k in range(n_frames):
+        M_donut, V_normals, _ = step(M_donut,V_normals,movement_rotations,spotlight,
+                                    frame_height,frame_width,2*(R1+R2),zoom,M_frames[k],jit,pool)
+    step_time = 1000*(time.perf_counter()-start)/n_frames
+
+    return step_time, M_frames
+
+
+def main():
+    """
+    Main function.
+    Time the full pipeline (rotation, shading, projection, encoding) for each output mode
+    and dithering method on a fixed console size, and print the results as a table.
+    Then emulate a resize on every frame, with and without buffer pool.
+    Finally compare the fused kernel to the NumPy pipeline for several point and thread counts.
+    """
+    print('{0} frames, {1}x{2} characters, {3} points'.format(
+                n_frames,frame_height,frame_width,n_theta*n_phi))
+    print('{0:<10} {1:<10} {2:>8} {3:>12}'.format('mode','dithering','fps','encode (ms)'))
+    for mode in modes:
+        for dithering in ditherings:
+            fps, encode_time = run(mode,dithering)
+            print('{0:<10} {1:<10} {2:>8.1f} {3:>12.3f}'.format(
+                        mode,str(dithering),fps,encode_time))
+
+    print()
+    print('{0} frames, console resized on every frame (allocated is the total for frame and character buffers)'.format(n_resize_frames))
+    print('{0:<10} {1:<6} {2:>10} {3:>10} {4:>10} {5:>16}'.format(
+                'mode','pool','mean (ms)','p99 (ms)','max (ms)','allocated (KB)'))
+    for mode in modes:
+        for use_pool in [False, True]:
+            frame_times, _ = thrash(mode,use_pool)
+            _, allocations = thrash(mode,use_pool,trace=True)
+            print('{0:<10} {1:<6} {2:>10.2f} {3:>10.2f} {4:>10.2f} {5:>16.1f}'.format(
+                        mode,str(use_pool),frame_times.mean(),np.percentile(frame_times,99),
+                        frame_times.max(),allocations.sum()))
+
+    print()
+    if numba is None:
+        print('Numba is not installed, fused kernel is skipped.')
+        return
+    print('{0} frames, fused kernel VS NumPy pipeline'.format(n_frames))
+    print('{0:>10} {1:>8} {2:>11} {3:>11} {4:>8} {5:>10}'.format(
+                'points','threads','numpy (ms)','jit (ms)','speedup','max error'))
+    threads = [n for n in [1,2,4,8,16,32] if n <= numba.config.NUMBA_NUM_THREADS]
+    for kernel_theta, kernel_phi in kernel_points:
+        numpy_time, M_numpy = kernel(kernel_theta,kernel_phi,False)
+        for n_threads in threads:
+            numba.set_num_threads(n_threads)
+            jit_time, M_jit = kernel(kernel_theta,kernel_phi,True)
+            print('{0:>10} {1:>8} {2:>11.2f} {3:>11.2f} {4:>8.1f} {5:>10.1e}'.format(
+                        kernel_theta*kernel_phi,n_threads,numpy_time,jit_time,numpy_time/jit_time,
+                        np.abs(M_numpy-M_jit).max()))
+        numba.set_num_threads(numba.config.NUMBA_NUM_THREADS)
+
+
+if __name__ == '__main__':
+    main()
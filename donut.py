@@ -34,9 +34,13 @@ __status__ = "Production"
 __version__ = "0.1.0"
 
 
-from utils.geom import base, donut, rotations, rotate, projection, shades, pixels
+import sys
+
+from utils.geom import base, donut, rotations, rotate, projection, shades, step
 from utils.render import points, vectors, colors, image, animate3d
-from utils.console import warning, screen, reset, asciis, render
+from utils.pool import buffer
+from utils.console import warning, screen, frame, resize, pause, reset, cells, encode, palette, grays, render
+from utils.config import arguments
 
 
 ##########################
@@ -68,6 +72,11 @@ debug = False
 char = [" ", ".", ",", "-", "~", ":", ";", "=", "!", "*", "#", "$", "@"]
 #char = [".", ",", "-", "~", ":", ";", "=", "+", "!", "?", "*", "&", "$", "%", "#", "@ "]
 
+mode = 'ascii'      # 'ascii', 'halfblock' (2x1 pixels per character) or 'braille' (4x2 pixels per character)
+dithering = None    # None, 'bayer' (ordered) or 'diffusion' (error diffusion)
+grayscale = None    # None, 'ansi256' or 'truecolor'
+jit = True          # Fused render kernel, only if Numba is installed
+
 
 ##########################
 #### DYNAMIC VARIABLES ###
@@ -85,6 +94,41 @@ elevation = 135
 warning_treshold = 1000
 preview_waiting = 5
 debug_waiting = 10
+integers = ['n_theta','n_phi','n_pixels','n_frames']  # Counts, other numbers are read as float
+choices = {
+    'mode': ['ascii','halfblock','braille'],
+    'dithering': [None,'bayer','diffusion'],
+    'grayscale': [None,'ansi256','truecolor'],
+}
+
+
+def defaults():
+    """Get current USER INPUTS.
+
+    Returns:
+        parameters (dict): Parameter names and values.
+    """
+    names = ['R1','radius_ratio','n_theta','n_phi',
+             'axis_A','axis_B','start_angle_A','start_angle_B',
+             'spotlight','n_pixels','zoom','n_frames','speed','speed_ratio',
+             'preview','debug','char','mode','dithering','grayscale','jit']
+
+    return {name: globals()[name] for name in names}
+
+
+def configure(argv=None):
+    """Override USER INPUTS from the command line (or a TOML file given with --config).
+    DYNAMIC VARIABLES are updated accordingly.
+
+    Args:
+        argv (array[str], optional): Command line arguments. Defaults to None (i.e. sys.argv).
+    """
+    global R2, donut_size, n_points
+    globals().update(arguments(defaults(),argv,'Render a rotating donut to the console in ascii.',
+                                integers,choices))
+    R2 = radius_ratio*R1
+    donut_size = 2*(R1+R2)
+    n_points = n_phi*n_theta
 
 
 def main():
@@ -148,26 +192,41 @@ def main():
     # Initialize the 2D screen (i.e. the console)
     # Rendering is terminated if the constraints can't be applied on screen
     scr,frame_height,frame_width = screen(n_pixels)
+    # Frame and character buffers are reused between frames (and between console sizes)
+    pool = {}
 
     try:
+        # Each character may draw several pixels depending on the output mode
+        # Invalid mode or grayscale values raise an error, console must be reset
+        cell_rows, cell_columns = cells(mode)
+        image_height = cell_rows*frame_height
+        image_width = cell_columns*frame_width
+        n_grays = palette(grayscale)
+
         # Render the scene frame by frame to emulate movement
         for k in range(n_frames):
-            
-            # Apply rotations to the donut and move it by a little
-            M_rotated_donut = rotate(M_rotated_donut, movement_rotations)
-            V_rotated_normals = rotate(V_rotated_normals, movement_rotations)
-            rotated_shades, light_indexes = shades(M_rotated_donut,V_rotated_normals,spotlight)
 
-            # Give a projection of the donut onto a 2D screen
-            M_pixels = pixels(M_rotated_donut,rotated_shades,light_indexes,
-                                frame_height,frame_width,donut_size,zoom)
+            # Follow console size, rendering is paused while the image doesn't fit
+            if resize(scr):
+                frame_height,frame_width = frame(scr,n_pixels)
+                if not frame_height:
+                    frame_height,frame_width = pause(scr,n_pixels)
+                image_height = cell_rows*frame_height
+                image_width = cell_columns*frame_width
+
+            # Apply rotations to the donut and move it by a little
+            # Then give a projection of the donut onto a 2D screen
+            M_rotated_donut, V_rotated_normals, M_pixels = step(M_rotated_donut,V_rotated_normals,
+                                movement_rotations,spotlight,image_height,image_width,donut_size,zoom,
+                                buffer(pool,(image_height,image_width)),jit,pool)
             
             
             # Map grayscale to ascii characters for each pixel
-            M_asciis = asciis(M_pixels,char)
+            M_asciis = encode(M_pixels,mode,char,dithering,pool)
+            M_colors = grays(M_pixels,n_grays,(cell_rows,cell_columns)) if n_grays else None
 
             # Print the result to the console
-            render(M_asciis,scr,k,n_frames)
+            render(M_asciis,scr,k,n_frames,M_colors)
 
             # Provide a 2D grayscale image for comparison when debugging
             if debug:
@@ -188,4 +247,5 @@ def main():
 
 
 if __name__ == '__main__':
+    configure(sys.argv[1:])
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Golden-frame regression harness for flying donut (headless, no console output).
+
+For more information, see README.
+
+For usage, run <python3 regression.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/14"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import os
+import sys
+import zlib
+import argparse
+
+import numpy as np
+
+from utils.geom import base
+from utils.headless import frames, checksum
+
+
+##########################
+####### SCENARIOS ########
+##########################
+# Every parameter is pinned so that editing USER INPUTS in donut.py doesn't change golden frames
+X,Y,Z = base()
+reference = {
+    'R1': 1, 'radius_ratio': 2, 'n_theta': 40, 'n_phi': 120,
+    'axis_A': X, 'axis_B': Z, 'start_angle_A': 0.5, 'start_angle_B': -0.5,
+    'spotlight': [0,2,10], 'n_pixels': 24, 'zoom': 1.0,
+    'n_frames': 200, 'speed': 0.5, 'speed_ratio': 3/7,
+    'preview': False, 'debug': False,
+    'char': [" ", ".", ",", "-", "~", ":", ";", "=", "!", "*", "#", "$", "@"],
+    'mode': 'ascii', 'dithering': None, 'grayscale': None, 'jit': False,
+}
+scenarios = {
+    'base': {},
+    'fast': {'speed': 1.5, 'speed_ratio': 3/1},
+    'zoom': {'zoom': 1.6, 'spotlight': [5,0,10]},
+    'ratio': {'radius_ratio': 1, 'n_pixels': 30},
+    'halfblock': {'mode': 'halfblock', 'dithering': 'bayer'},
+    'braille': {'mode': 'braille', 'dithering': 'diffusion'},
+}
+
+
+##########################
+#### STATIC VARIABLES ####
+##########################
+golden_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)),'goldens')
+
+
+def record(name,jit=False):
+    """Render a scenario and pack its frames.
+
+    Args:
+        name (str): Scenario name.
+        jit (bool, optional): Use the fused kernel instead of the NumPy pipeline (see utils.geom.step). Defaults to False.
+
+    Returns:
+        golden (dict): Frames as uint8 grayscale images and unicode code points,
+        with one CRC-32 per frame for each of them.
+    """
+    parameters = dict(reference,**scenarios[name],jit=jit)
+    frame_height = parameters['n_pixels']
+    frame_width = 2*frame_height
+
+    M_pixels, M_characters = zip(*frames(parameters,frame_height,frame_width))
+    # Grayscale is stored with 8 bits (1/255 precision is enough to catch shading changes)
+    pixels = np.rint(255*np.array(M_pixels)).astype(np.uint8)
+    characters = np.array(M_characters).view(np.uint32)
+    if characters.max(initial=0) < 2**16:
+        # Every output mode uses characters of the unicode Basic Multilingual Plane
+        characters = characters.astype(np.uint16)
+
+    golden = {
+        'pixels': pixels,
+        'characters': characters,
+        'pixel_hashes': np.array([zlib.crc32(frame.tobytes()) for frame in pixels],dtype=np.uint32),
+        'character_hashes': np.array([checksum(frame) for frame in M_characters],dtype=np.uint32),
+    }
+
+    return golden
+
+
+def compare(golden,current,tolerance=1,ratio=0.001):
+    """Compare two recordings of the same scenario.
+    Frames are compared by hash first, pixels and characters are only diffed on mismatch.
+
+    Args:
+        golden (dict): Reference recording (see record).
+        current (dict): New recording (see record).
+        tolerance (int, optional): Maximum difference allowed on a pixel (8 bits grayscale). Defaults to 1.
+        ratio (float, optional): Maximum ratio of pixels (or characters) allowed to differ in a frame. Defaults to 0.001.
+
+    Returns:
+        failures (array[str]): Description of the frames out of tolerance (empty if scenario passes).
+        n_mismatches (int): Number of frames with a hash mismatch (within tolerance or not).
+    """
+    if golden['pixels'].shape != current['pixels'].shape:
+        return ['shape {0} instead of {1}'.format(current['pixels'].shape,golden['pixels'].shape)], 0
+
+    mismatches = np.flatnonzero((golden['pixel_hashes'] != current['pixel_hashes'])
+                                | (golden['character_hashes'] != current['character_hashes']))
+    # Pull arrays out once, indexing an NpzFile decompresses the whole array again
+    golden_pixels, golden_characters = golden['pixels'], golden['characters']
+    failures = []
+    for k in mismatches:
+        pixel_errors = np.abs(golden_pixels[k].astype(int)-current['pixels'][k])
+        n_pixels = np.count_nonzero(pixel_errors > tolerance)
+        n_characters = np.count_nonzero(golden_characters[k] != current['characters'][k])
+        if n_pixels > ratio*pixel_errors.size or n_characters > ratio*golden_characters[k].size:
+            failures.append('frame {0}: {1} pixels (max error {2}) and {3} characters differ'.format(
+                                k,n_pixels,pixel_errors.max(),n_characters))
+
+    return failures, len(mismatches)
+
+
+def main():
+    """
+    Main function.
+    Compare every scenario to its golden frames (or record golden frames with --record).
+    Golden frames are recorded with the NumPy pipeline, use --jit to check the fused kernel against them.
+    Exit status is 1 if any scenario fails.
+    """
+    parser = argparse.ArgumentParser(description='Golden-frame regression harness for flying donut.')
+    parser.add_argument('--record',action='store_true',help='overwrite golden frames')
+    parser.add_argument('--jit',action='store_true',help='render with the fused kernel (requires Numba)')
+    parser.add_argument('--scenario',nargs='+',choices=list(scenarios),default=list(scenarios))
+    parser.add_argument('--tolerance',type=int,default=1,help='maximum error on a pixel (0-255)')
+    parser.add_argument('--ratio',type=float,default=0.001,help='maximum ratio of differing pixels per frame')
+    args = parser.parse_args()
+    if args.record and args.jit:
+        parser.error('golden frames must be recorded with the NumPy pipeline')
+
+    passed = True
+    for name in args.scenario:
+        path = os.path.join(golden_directory,'{0}.npz'.format(name))
+        current = record(name,args.jit)
+        if args.record:
+            os.makedirs(golden_directory,exist_ok=True)
+            np.savez_compressed(path,**current)
+            print('{0:<10} recorded {1} frames'.format(name,len(current['pixels'])))
+            continue
+        if not os.path.exists(path):
+            print('{0:<10} MISSING (run with --record)'.format(name))
+            passed = False
+            continue
+        # Decompress golden arrays once (NpzFile decompresses on every access)
+        with np.load(path) as f:
+            golden = dict(f)
+        failures, n_mismatches = compare(golden,current,args.tolerance,args.ratio)
+        if failures:
+            passed = False
+            print('{0:<10} FAILED ({1} frames out of tolerance)'.format(name,len(failures)))
+            for failure in failures[:10]:
+                print('    {0}'.format(failure))
+        else:
+            print('{0:<10} passed ({1} frames, {2} hash mismatches within tolerance)'.format(
+                        name,len(current['pixels']),n_mismatches))
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
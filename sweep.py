@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Run a parameter sweep of flying donut (headless, no console output).
+
+For more information, see README.
+
+For usage, run <python3 sweep.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/14"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import csv
+import time
+import zlib
+import argparse
+import tracemalloc
+import multiprocessing
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    # Optional, fused kernel falls back to the NumPy pipeline
+    numba = None
+
+from donut import defaults, integers, choices
+from utils.config import load, check, convert, grid
+from utils.headless import frames, checksum
+
+
+##########################
+#### STATIC VARIABLES ####
+##########################
+default_height = 40     # Frame height used when n_pixels is -1 (autoscale)
+memory_frames = 10      # Frames rendered again with tracemalloc to measure peak memory
+
+
+def threads(n_threads):
+    """Set the number of threads used by the fused kernel in a worker process.
+
+    Args:
+        n_threads (int): Number of threads.
+    """
+    if numba is not None:
+        numba.set_num_threads(n_threads)
+
+
+def measure(parameters):
+    """Render all frames for a given combination and measure performances.
+    Preview and debug modes are ignored since there is no console.
+
+    Args:
+        parameters (dict): Scene parameters (same keys as USER INPUTS in donut.py).
+
+    Returns:
+        results (dict): Frames per second, threads, peak memory in MB and frame checksums.
+    """
+    frame_height = parameters['n_pixels'] if parameters['n_pixels']>0 else default_height
+    frame_width = 2*frame_height
+
+    # Warm up (Numba cache loading and compilation happen on first call)
+    for _ in frames(dict(parameters,n_frames=1),frame_height,frame_width):
+        pass
+
+    start = time.perf_counter()
+    checksums = [checksum(M_characters) for _, M_characters in frames(parameters,frame_height,frame_width)]
+    elapsed = time.perf_counter()-start
+
+    # Memory allocated while rendering (tracemalloc slows frames down, so it is measured apart)
+    tracemalloc.start()
+    for _ in frames(dict(parameters,n_frames=min(memory_frames,parameters['n_frames'])),
+                    frame_height,frame_width):
+        pass
+    peak_memory = tracemalloc.get_traced_memory()[1]/1024**2
+    tracemalloc.stop()
+
+    results = {
+        'fps': len(checksums)/elapsed,
+        'threads': numba.get_num_threads() if numba is not None and parameters['jit'] else 1,
+        'peak_memory': peak_memory,
+        'checksum': '{0:08x}'.format(zlib.crc32(np.array(checksums,dtype=np.uint32).tobytes())),
+        'frame_checksums': ' '.join('{0:08x}'.format(c) for c in checksums),
+    }
+
+    return results
+
+
+def sweep(path,workers=None,n_threads=None):
+    """Run every combination of a sweep file in a worker pool.
+    The sweep file is a TOML file with two tables :
+    - [base] : parameters shared by all combinations (optional).
+    - [sweep] : lists of values to try for each parameter.
+
+    Args:
+        path (str): Path to the sweep file.
+        workers (int, optional): Number of worker processes. Defaults to None (i.e. number of CPUs).
+        n_threads (int, optional): Number of fused kernel threads per worker. Defaults to None (i.e. CPUs shared between workers).
+
+    Returns:
+        combinations (array[dict]): Parameters that vary for each combination.
+        results (array[dict]): Measures for each combination (see measure).
+    """
+    parameters = defaults()
+    config = load(path)
+    # Every combination is checked before starting, so that an invalid value doesn't waste a whole sweep
+    parameters.update(convert(config.get('base',{}),parameters,integers,choices))
+    combinations = [convert(combination,parameters,integers,choices)
+                        for combination in grid(check(config.get('sweep',{}),parameters))]
+    runs = [dict(parameters,**combination) for combination in combinations]
+
+    # Workers share the CPUs, the fused kernel must not start one thread per CPU in every worker
+    workers = workers or multiprocessing.cpu_count()
+    n_threads = n_threads or max(1,multiprocessing.cpu_count()//workers)
+    # Each combination gets a fresh process so that runs don't share memory
+    with multiprocessing.Pool(workers,threads,(n_threads,),maxtasksperchild=1) as pool:
+        results = pool.map(measure,runs,chunksize=1)
+
+    return combinations, results
+
+
+def main():
+    """
+    Main function.
+    Run a sweep file, print a summary table and save the full results table to CSV.
+    """
+    parser = argparse.ArgumentParser(description='Run a parameter sweep of flying donut.')
+    parser.add_argument('path',help='TOML sweep file')
+    parser.add_argument('--workers',type=int,default=None,
+                        help='number of worker processes (use 1 for accurate frame rates)')
+    parser.add_argument('--threads',type=int,default=None,
+                        help='number of fused kernel threads per worker (CPUs shared between workers by default)')
+    parser.add_argument('--output',default='sweep.csv',help='CSV results table')
+    args = parser.parse_args()
+
+    combinations, results = sweep(args.path,args.workers,args.threads)
+
+    names = list(combinations[0]) if combinations else []
+    with open(args.output,'w',newline='') as f:
+        writer = csv.DictWriter(f,fieldnames=names+['fps','threads','peak_memory','checksum','frame_checksums'])
+        writer.writeheader()
+        for combination, result in zip(combinations,results):
+            writer.writerow(dict(combination,**result))
+
+    for combination, result in zip(combinations,results):
+        settings = ' '.join('{0}={1}'.format(name,value) for name, value in combination.items())
+        print('{0:>8.1f} fps {1:>3} threads {2:>8.1f} MB  {3}  {4}'.format(
+                    result['fps'],result['threads'],result['peak_memory'],result['checksum'],settings))
+    print('Results saved to {0}.'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
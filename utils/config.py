@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Configuration module for flying donut (command line and TOML files).
+
+For more information, see README.
+
+For usage, run <python3 donut.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/16"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import argparse
+import itertools
+
+
+def load(path):
+    """Load parameters from a TOML file.
+
+    Args:
+        path (str): Path to the TOML file.
+
+    Returns:
+        parameters (dict): Parameters read from the file.
+    """
+    try:
+        import tomllib
+    except ImportError:
+        # Python < 3.11, only needed when a TOML file is given
+        import tomli as tomllib
+    with open(path,'rb') as f:
+        parameters = tomllib.load(f)
+
+    return parameters
+
+
+def option(value):
+    """Convert a string to an optional parameter value.
+
+    Args:
+        value (str): Command line or TOML string.
+
+    Returns:
+        value (str): Parameter value ('none' is converted to None).
+    """
+    return None if value.lower() == 'none' else value
+
+
+def kind(name,default,integers=()):
+    """Get the type used to read a parameter.
+    Numbers are read as float, except counts listed in integers.
+
+    Args:
+        name (str): Parameter name.
+        default: Default value of the parameter.
+        integers (array[str], optional): Names of the parameters read as int. Defaults to ().
+
+    Returns:
+        kind (type): Type of the parameter (or of its items for lists), option for strings and None values.
+    """
+    if isinstance(default,bool):
+        return bool
+    elif isinstance(default,(int,float)):
+        return int if name in integers else float
+    elif isinstance(default,list):
+        return str if default and isinstance(default[0],str) else float
+    else:
+        return option
+
+
+def arguments(defaults,argv=None,description=None,integers=(),choices=None):
+    """Parse command line arguments. A TOML file can also be given with <--config>.
+    Priority order is : command line, then TOML file, then defaults.
+
+    Args:
+        defaults (dict): Default parameters. Only booleans, numbers, strings, lists and None values are exposed.
+        argv (array[str], optional): Command line arguments. Defaults to None (i.e. sys.argv).
+        description (str, optional): Program description. Defaults to None.
+        integers (array[str], optional): Names of the parameters read as int (see kind). Defaults to ().
+        choices (dict, optional): Allowed values for some parameters. Defaults to None.
+
+    Returns:
+        parameters (dict): Parameters after overrides (same keys as defaults).
+    """
+    choices = choices or {}
+    # Options that are not given are left out of the results (so that 'none' can override)
+    parser = argparse.ArgumentParser(description=description,argument_default=argparse.SUPPRESS)
+    parser.add_argument('--config',default=None,help='TOML file containing parameters')
+    for name, value in defaults.items():
+        flag = '--{0}'.format(name)
+        if not exposed(value):
+            continue
+        elif isinstance(value,bool):
+            parser.add_argument(flag,action=argparse.BooleanOptionalAction)
+        elif isinstance(value,list):
+            # Vectors of numbers keep the length of their default value (e.g. 3D positions)
+            item = kind(name,value,integers)
+            parser.add_argument(flag,nargs='+' if item is str else len(value),type=item)
+        else:
+            parser.add_argument(flag,type=kind(name,value,integers),choices=choices.get(name))
+    args = vars(parser.parse_args(argv))
+
+    parameters = dict(defaults)
+    config = args.pop('config')
+    if config is not None:
+        parameters.update(convert(load(config),defaults,integers,choices))
+    parameters.update(args)
+
+    return parameters
+
+
+def exposed(value):
+    """Check if a parameter can be set from the command line or a TOML file.
+
+    Args:
+        value: Default value of the parameter.
+
+    Returns:
+        exposed (bool): True for booleans, numbers, strings, lists and None values.
+    """
+    return value is None or isinstance(value,(bool,int,float,str,list))
+
+
+def check(parameters,defaults):
+    """Make sure parameters are known.
+
+    Args:
+        parameters (dict): Parameters to be checked.
+        defaults (dict): Default parameters.
+
+    Returns:
+        parameters (dict): Same as input.
+    """
+    unknown = {name for name in parameters if name not in defaults or not exposed(defaults[name])}
+    if unknown:
+        raise ValueError('Unknown parameters <{0}>.'.format(', '.join(sorted(unknown))))
+
+    return parameters
+
+
+def convert(parameters,defaults,integers=(),choices=None):
+    """Check parameters read from a file and convert them to the same types as the command line.
+
+    Args:
+        parameters (dict): Parameters to be converted.
+        defaults (dict): Default parameters.
+        integers (array[str], optional): Names of the parameters read as int (see kind). Defaults to ().
+        choices (dict, optional): Allowed values for some parameters. Defaults to None.
+
+    Returns:
+        parameters (dict): Converted parameters.
+    """
+    converted = {}
+    for name, value in check(parameters,defaults).items():
+        default = defaults[name]
+        item = kind(name,default,integers)
+        values = value if isinstance(default,list) else [value]
+        if isinstance(default,list) != isinstance(value,list):
+            raise ValueError('Invalid value <{0}> for parameter <{1}>.'.format(value,name))
+        if isinstance(default,list) and item is not str and len(value) != len(default):
+            raise ValueError('Parameter <{0}> must contain {1} values.'.format(name,len(default)))
+        for v in values:
+            # Booleans are not accepted as numbers, int values must be integers
+            valid = (isinstance(v,bool) if item is bool
+                        else isinstance(v,str) if item in (str,option)
+                        else isinstance(v,(int,float)) and not isinstance(v,bool)
+                                and (item is float or float(v).is_integer()))
+            if not valid:
+                raise ValueError('Invalid value <{0}> for parameter <{1}>.'.format(value,name))
+        values = [item(v) for v in values]
+        converted[name] = values if isinstance(default,list) else values[0]
+        if choices and name in choices and converted[name] not in choices[name]:
+            raise ValueError('Invalid value <{0}> for parameter <{1}>, choose from {2}.'.format(
+                                value,name,choices[name]))
+
+    return converted
+
+
+def grid(sweep):
+    """Generate all combinations of parameter values.
+
+    Args:
+        sweep (dict): Parameter names and list of values to try for each of them.
+
+    Returns:
+        combinations (array[dict]): One dictionary per combination (cartesian product).
+    """
+    names = list(sweep)
+    combinations = [dict(zip(names,values))
+                        for values in itertools.product(*(sweep[name] for name in names))]
+
+    return combinations
@@ -36,9 +36,12 @@ __version__ = "0.1.0"
 
 import sys
 import time
+import locale
 import curses
 import numpy
 
+from utils.pool import buffer
+
 
 def warning(mode='<mode>',duration=10):
     """Print user warning.
@@ -59,34 +62,59 @@ def warning(mode='<mode>',duration=10):
     print("Moving on to the rendering.")
 
 
-def screen(n_pixels):
-    """Initialize ascii screen.
+def frame(scr,n_pixels):
+    """Compute ascii frame size for the current console size.
 
     Args:
+        scr (screen): Initialized screen.
         n_pixels (int): Screen size in pixels (each pixel is ASCII character).
 
     Returns:
-        scr (screen): Initialized screen.
-        frame_height (int) : ASCII frame height. 
+        frame_height (int) : ASCII frame height (0 if the image doesn't fit in the console).
         frame_width (int) : ASCII frame width (ASCII image aspect ratio is 2:1).
     """
-    # Initialize screen
-    scr = curses.initscr()
-
     # Get the maximum possible size for the current console
     screen_height,screen_width= scr.getmaxyx()
     # Get the maximum possible size for the ascii screen within the console
     # IMPORTANT! It takes twice as much columns than lines to draw ascii art
     frame_size = min(screen_height,numpy.floor(screen_width/2).astype(int))
+    if frame_size == screen_height and 2*frame_size == screen_width:
+        # Curses can't write the bottom-right cell, leave the last row free
+        frame_size -= 1
     if n_pixels<=0:
         # Auto-scale
         frame_height = frame_size
-        frame_width = 2*frame_size
     elif n_pixels<=frame_size:
         # Manual scale
         frame_height = n_pixels
-        frame_width = 2*n_pixels
     else :
+        # Contraints can't be applied
+        frame_height = 0
+
+    return int(frame_height),2*int(frame_height)
+
+
+def screen(n_pixels):
+    """Initialize ascii screen.
+
+    Args:
+        n_pixels (int): Screen size in pixels (each pixel is ASCII character).
+
+    Returns:
+        scr (screen): Initialized screen.
+        frame_height (int) : ASCII frame height. 
+        frame_width (int) : ASCII frame width (ASCII image aspect ratio is 2:1).
+    """
+    # Initialize screen
+    # Locale is required for curses to print unicode characters (half-blocks, Braille)
+    locale.setlocale(locale.LC_ALL, '')
+    scr = curses.initscr()
+    # Read keys without blocking, resize events are reported as KEY_RESIZE
+    scr.keypad(True)
+    scr.nodelay(True)
+
+    frame_height,frame_width = frame(scr,n_pixels)
+    if not frame_height:
         # Contraints can't be applied
         # Go back to previous console display and print error message
         curses.endwin()
@@ -102,34 +130,309 @@ def screen(n_pixels):
     return scr,frame_height,frame_width
 
 
+def resize(scr):
+    """Consume pending key events and check if the console has been resized.
+    Curses handles SIGWINCH and reports it as a KEY_RESIZE key event.
+
+    Args:
+        scr (screen): Initialized screen.
+
+    Returns:
+        resized (bool): True if the console has been resized since last call.
+    """
+    resized = False
+    key = scr.getch()
+    while key != -1:
+        resized = resized or key == curses.KEY_RESIZE
+        key = scr.getch()
+    if resized:
+        curses.update_lines_cols()
+        scr.clear()
+
+    return resized
+
+
+def overflow(scr):
+    """Print error message on screen when the image doesn't fit in the console anymore.
+
+    Args:
+        scr (screen): Initialized screen.
+    """
+    try:
+        scr.addstr(0, 0, 'Image size exceeds console size.')
+    except curses.error:
+        # Console is too small to print the message
+        pass
+    scr.refresh()
+
+
+def pause(scr,n_pixels):
+    """Wait until the console is large enough for the image.
+    Keys are read in blocking mode, so no frame is rendered (nor counted) meanwhile.
+
+    Args:
+        scr (screen): Initialized screen.
+        n_pixels (int): Screen size in pixels (each pixel is ASCII character).
+
+    Returns:
+        frame_height (int) : ASCII frame height.
+        frame_width (int) : ASCII frame width (ASCII image aspect ratio is 2:1).
+    """
+    scr.nodelay(False)
+    frame_height,frame_width = 0,0
+    while not frame_height:
+        overflow(scr)
+        if scr.getch() == curses.KEY_RESIZE:
+            curses.update_lines_cols()
+            scr.clear()
+            frame_height,frame_width = frame(scr,n_pixels)
+    scr.nodelay(True)
+
+    return frame_height,frame_width
+
+
 def reset():
     """Go back to previous console display
     """
     curses.endwin()
 
 
-def asciis(pixels,char):
+def cells(mode='ascii'):
+    """Get the number of pixels drawn by a single console character.
+
+    Args:
+        mode (str, optional): Output mode (can be 'ascii', 'halfblock' or 'braille'). Defaults to 'ascii'.
+
+    Returns:
+        n_rows (int): Number of pixel rows per character.
+        n_columns (int): Number of pixel columns per character.
+    """
+    if mode == 'ascii':
+        return 1,1
+    elif mode == 'halfblock':
+        # Upper and lower half blocks, 2 vertical pixels per character
+        return 2,1
+    elif mode == 'braille':
+        # Braille patterns, 2 columns of 4 dots per character
+        return 4,2
+    else:
+        raise ValueError('Unknown output mode <{0}>.'.format(mode))
+
+
+def bayer(n):
+    """Compute Bayer threshold matrix for ordered dithering.
+
+    Args:
+        n (int): Matrix size (must be a power of 2).
+
+    Returns:
+        thresholds (array[float]): Threshold values in [0,1) (shape is (n,n)).
+    """
+    M = numpy.zeros((1,1),dtype=int)
+    while M.shape[0] < n:
+        M = numpy.block([[4*M,4*M+2],[4*M+3,4*M+1]])
+    thresholds = (M+0.5)/M.size
+
+    return thresholds
+
+
+def dither(pixels,n_levels,method=None):
+    """Quantize 2D grayscale image to a given number of levels.
+
+    Args:
+        pixels (array(float)): 2D array representing grayscale image (values in [0,1]).
+        n_levels (int): Number of quantization levels.
+        method (str, optional): Dithering method (can be None, 'bayer' or 'diffusion'). Defaults to None.
+
+    Returns:
+        levels (array(int)): Quantization level for each pixel (values in [0,n_levels-1]).
+    """
+    if method is None:
+        # Plain truncation, same mapping as the original ASCII ramp
+        levels = numpy.floor(n_levels*pixels).astype(int)
+    elif method == 'bayer':
+        # Ordered dithering, threshold matrix is tiled over the whole image
+        n_rows, n_columns = pixels.shape
+        thresholds = numpy.tile(bayer(4),(n_rows//4+1,n_columns//4+1))[:n_rows,:n_columns]
+        levels = numpy.floor((n_levels-1)*pixels+thresholds).astype(int)
+    elif method == 'diffusion':
+        # Error diffusion, rows are quantized one at a time (vectorized along the row)
+        # and the quantization error is pushed to the row below (weights 3/9, 5/9, 1/9)
+        values = (n_levels-1)*numpy.asarray(pixels,dtype=float)
+        levels = numpy.zeros(values.shape,dtype=int)
+        error = numpy.zeros(values.shape[1])
+        for i in range(values.shape[0]):
+            row = values[i]+error
+            levels[i] = numpy.rint(row)
+            residual = row-levels[i]
+            error = 5/9*residual
+            error[1:] += 3/9*residual[:-1]
+            error[:-1] += 1/9*residual[1:]
+    else:
+        raise ValueError('Unknown dithering method <{0}>.'.format(method))
+
+    return numpy.clip(levels,0,n_levels-1)
+
+
+def lookup(table,codes,pool=None):
+    """Map integer codes to characters.
+
+    Args:
+        table (array(str)): Characters for each code.
+        codes (array(int)): 2D array of codes.
+        pool (dict, optional): Buffer pool used for the result (see buffer). Defaults to None.
+
+    Returns:
+        characters (array(str)): 2D array of characters (same shape as codes).
+    """
+    table = numpy.asarray(table)
+    out = None if pool is None else buffer(pool,codes.shape,table.dtype)
+
+    return numpy.take(table,codes,out=out)
+
+
+def asciis(pixels,char,method=None,pool=None):
     """Convert 2D grayscale image to ASCII characters.
 
     Args:
         pixels (array(float)): 2D array representing graysclale image.
         char (array(str)): List of ASCII characters.
+        method (str, optional): Dithering method (see dither). Defaults to None.
+        pool (dict, optional): Buffer pool used for the result (see buffer). Defaults to None.
 
     Returns:
-        ascii_characters (array(str)): 
+        ascii_characters (array(str)): 2D array containing ASCII characters (same shape as pixels).
     """
-    n_rows, n_columns = pixels.shape
-    n_char = len(char)
     # Map intensity values to characters
-    ascii_characters =   [
-                            [char[int(numpy.floor(n_char*pixels[i,j]))] 
-                            for j in range(n_columns)] 
-                        for i in range(n_rows)]
-                          
+    ascii_characters = lookup(char,dither(pixels,len(char),method),pool)
+
     return ascii_characters
 
 
-def render(ascii_characters,screen,current_frame,n_frames):
+def halfblocks(pixels,method=None,pool=None):
+    """Convert 2D grayscale image to unicode half-block characters (2 vertical pixels per character).
+
+    Args:
+        pixels (array(float)): 2D array representing grayscale image (shape must be (2*n,m)).
+        method (str, optional): Dithering method (see dither). Defaults to None.
+        pool (dict, optional): Buffer pool used for the result (see buffer). Defaults to None.
+
+    Returns:
+        block_characters (array(str)): 2D array containing half-block characters (shape is (n,m)).
+    """
+    n_rows, n_columns = pixels.shape
+    bits = dither(pixels,2,method).reshape(n_rows//2,2,n_columns)
+    # Pack upper pixel as bit 0 and lower pixel as bit 1
+    codes = bits[:,0,:] | (bits[:,1,:] << 1)
+    block_characters = lookup([' ','\u2580','\u2584','\u2588'],codes,pool)
+
+    return block_characters
+
+
+def braille(pixels,method=None,pool=None):
+    """Convert 2D grayscale image to unicode Braille characters (2x4 pixels per character).
+
+    Args:
+        pixels (array(float)): 2D array representing grayscale image (shape must be (4*n,2*m)).
+        method (str, optional): Dithering method (see dither). Defaults to None.
+        pool (dict, optional): Buffer pool used for the result (see buffer). Defaults to None.
+
+    Returns:
+        braille_characters (array(str)): 2D array containing Braille characters (shape is (n,m)).
+    """
+    n_rows, n_columns = pixels.shape
+    bits = dither(pixels,2,method).reshape(n_rows//4,4,n_columns//2,2)
+    # Dot numbering of the unicode Braille block (U+2800 + sum of dot bits)
+    weights = numpy.array([[0x01,0x08],
+                           [0x02,0x10],
+                           [0x04,0x20],
+                           [0x40,0x80]])
+    codes = numpy.einsum('iajb,ab->ij',bits,weights)
+    braille_characters = lookup([chr(0x2800+code) for code in range(256)],codes,pool)
+
+    return braille_characters
+
+
+def encode(pixels,mode='ascii',char=None,method=None,pool=None):
+    """Convert 2D grayscale image to console characters for a given output mode.
+
+    Args:
+        pixels (array(float)): 2D array representing grayscale image (shape must be a multiple of cells(mode)).
+        mode (str, optional): Output mode (see cells). Defaults to 'ascii'.
+        char (array(str), optional): List of ASCII characters, only used in 'ascii' mode. Defaults to None.
+        method (str, optional): Dithering method (see dither). Defaults to None.
+        pool (dict, optional): Buffer pool used for the result (see buffer). Defaults to None.
+
+    Returns:
+        characters (array(str)): 2D array containing console characters.
+    """
+    if mode == 'ascii':
+        return asciis(pixels,char,method,pool)
+    elif mode == 'halfblock':
+        return halfblocks(pixels,method,pool)
+    elif mode == 'braille':
+        return braille(pixels,method,pool)
+    else:
+        raise ValueError('Unknown output mode <{0}>.'.format(mode))
+
+
+def palette(grayscale=None):
+    """Initialize grayscale color pairs. Must be called once the screen is initialized.
+    Falls back to 256 colors if truecolor is not available, and to no color at all if
+    the console does not support 256 colors.
+
+    Args:
+        grayscale (str, optional): Color mode (can be None, 'ansi256' or 'truecolor'). Defaults to None.
+
+    Returns:
+        n_grays (int): Number of available gray levels (0 means colors are disabled).
+    """
+    if grayscale is None:
+        return 0
+    if grayscale not in ('ansi256','truecolor'):
+        raise ValueError('Unknown grayscale mode <{0}>.'.format(grayscale))
+    if not curses.has_colors():
+        return 0
+    curses.start_color()
+    if curses.COLORS < 256:
+        return 0
+    if grayscale == 'truecolor' and curses.can_change_color():
+        # Redefine the palette above the 16 system colors (RGB components range is [0,1000])
+        n_grays = min(curses.COLORS-16,curses.COLOR_PAIRS-1,256)
+        for k in range(n_grays):
+            value = int(1000*k/(n_grays-1))
+            curses.init_color(16+k,value,value,value)
+            curses.init_pair(1+k,16+k,curses.COLOR_BLACK)
+    else:
+        # Use the 24 gray levels of the standard 256 colors palette
+        n_grays = min(24,curses.COLOR_PAIRS-1)
+        for k in range(n_grays):
+            curses.init_pair(1+k,232+k,curses.COLOR_BLACK)
+
+    return n_grays
+
+
+def grays(pixels,n_grays,shape=(1,1)):
+    """Compute grayscale color pair for each console character.
+
+    Args:
+        pixels (array(float)): 2D array representing grayscale image.
+        n_grays (int): Number of gray levels (see palette).
+        shape (tuple(int), optional): Number of pixels per character (see cells). Defaults to (1,1).
+
+    Returns:
+        color_pairs (array(int)): Color pair index for each character (0 is the default color pair).
+    """
+    n_rows, n_columns = pixels.shape
+    cell_rows, cell_columns = shape
+    # Average intensity over the pixels drawn by each character
+    intensities = pixels.reshape(n_rows//cell_rows,cell_rows,n_columns//cell_columns,cell_columns).mean(axis=(1,3))
+    color_pairs = 1+numpy.minimum(numpy.floor(n_grays*intensities),n_grays-1).astype(int)
+
+    return color_pairs
+
+
+def render(ascii_characters,screen,current_frame,n_frames,color_pairs=None):
     """Print ASCII characters to console.
 
     Args:
@@ -137,14 +440,21 @@ def render(ascii_characters,screen,current_frame,n_frames):
         screen (screen): ASCII screen. 
         current_frame (int): Current frame number.
         n_frames (int): Total number of frames.
+        color_pairs (array[int], optional): Color pair index for each character (see grays). Defaults to None.
     """
-    # Get frame shape
-    n_rows = len(ascii_characters)
-    n_columns = len(ascii_characters[0])
-    # Print ASCII characters one by one
-    for i in range(n_rows):
-        for j in range(n_columns):
-            screen.addstr(i, j, ascii_characters[i][j])
+    # Print ASCII characters line by line
+    for i, line in enumerate(numpy.asarray(ascii_characters).tolist()):
+        if color_pairs is None:
+            screen.addstr(i, 0, ''.join(line))
+        else:
+            # Split the line into runs of characters sharing the same color
+            n_columns = len(line)
+            edges = numpy.flatnonzero(numpy.diff(color_pairs[i]))+1
+            starts = numpy.concatenate(([0],edges))
+            ends = numpy.concatenate((edges,[n_columns]))
+            for start, end in zip(starts,ends):
+                screen.addstr(i, int(start), ''.join(line[start:end]),
+                                curses.color_pair(int(color_pairs[i,start])))
     msg = '{0}/{1}'.format(current_frame+1,n_frames)
     # Refresh screen
     screen.addstr(0, 0, msg )
@@ -37,6 +37,14 @@ __version__ = "0.1.0"
 import numpy as np
 from scipy.spatial.transform import Rotation as R
 
+from utils.pool import buffer
+
+try:
+    import numba
+except ImportError:
+    # Optional, fused kernel falls back to the NumPy pipeline
+    numba = None
+
 
 def base():
     """Compute base vectors [X,Y,Z].
@@ -183,7 +191,7 @@ def shades(M,N,s):
     return lambert,light_indexes
 
 
-def pixels(M,shades,indexes,frame_height,frame_width,size,zoom):
+def pixels(M,shades,indexes,frame_height,frame_width,size,zoom,out=None):
     """Make of projection of a set of 3D illuminated points onto a 2D screen.
 
     Args:
@@ -194,12 +202,17 @@ def pixels(M,shades,indexes,frame_height,frame_width,size,zoom):
         frame_width (int): Width of the 2D screen.
         size (float): Maximum Size of 3D object.
         zoom (float): Zoom factor.
+        out (array[float], optional): Reusable 2D screen (shape must be (frame_height,frame_width)). Defaults to None.
 
     Returns:
         M_pixels (array[float]): 2D grayscale image (shape is (frame_height,frame_width)).
     """
     # Initialize 2D screen
-    M_pixels = np.zeros((frame_height,frame_width))
+    if out is None:
+        M_pixels = np.zeros((frame_height,frame_width))
+    else:
+        M_pixels = out
+        M_pixels.fill(0)
 
     # Map 3D points to the 2D pixels (contained in (X,Y) plane)
     ### (X,Y) 3D positions are mapped to position on the screen (row,column) 
@@ -217,9 +230,109 @@ def pixels(M,shades,indexes,frame_height,frame_width,size,zoom):
     # Make sure the brightest points is represented on the screen
     # Points that are in the dark or outside the screen are ignored
     valid_index = np.setdiff1d(indexes,xy_indexes)
-    for idx in valid_index:
-        x = x_donut[idx]
-        y = y_donut[idx]
-        M_pixels[y,x] = np.maximum(shades[idx],M_pixels[y,x])
+    np.maximum.at(M_pixels,(y_donut[valid_index],x_donut[valid_index]),shades[valid_index])
+
+    return M_pixels
+
+
+if numba is not None:
+    @numba.njit(parallel=True,cache=True)
+    def kernel(M,N,rotation,s,scale_x,scale_y,M_out,N_out,M_chunks):
+        """Rotate, shade, cull, project and max-reduce every point in a single pass.
+        Points are split in chunks processed in parallel, each chunk owns a 2D screen.
+        Outputs may be the same arrays as inputs (every point is read before being written).
+
+        Args:
+            M (array[float]): Points on the surface (shape must be (n,3)).
+            N (array[float]): Normal vector at each given point on the surface (shape must be (n,3)).
+            rotation (array[float]): Rotation matrix (shape must be (3,3)).
+            s (array[float]): Light source position (shape must be (3,)).
+            scale_x (float): Columns per unit length.
+            scale_y (float): Rows per unit length.
+            M_out (array[float]): Points after rotation (same shape as M).
+            N_out (array[float]): Normal vectors after rotation (same shape as N).
+            M_chunks (array[float]): One 2D screen per chunk (shape must be (n_chunks,frame_height,frame_width)).
+        """
+        n_points = M.shape[0]
+        n_chunks, frame_height, frame_width = M_chunks.shape
+        chunk_size = (n_points+n_chunks-1)//n_chunks
+        for c in numba.prange(n_chunks):
+            M_chunks[c] = 0
+            for i in range(c*chunk_size,min((c+1)*chunk_size,n_points)):
+                # Rotate point and normal vector
+                px = rotation[0,0]*M[i,0]+rotation[0,1]*M[i,1]+rotation[0,2]*M[i,2]
+                py = rotation[1,0]*M[i,0]+rotation[1,1]*M[i,1]+rotation[1,2]*M[i,2]
+                pz = rotation[2,0]*M[i,0]+rotation[2,1]*M[i,1]+rotation[2,2]*M[i,2]
+                nx = rotation[0,0]*N[i,0]+rotation[0,1]*N[i,1]+rotation[0,2]*N[i,2]
+                ny = rotation[1,0]*N[i,0]+rotation[1,1]*N[i,1]+rotation[1,2]*N[i,2]
+                nz = rotation[2,0]*N[i,0]+rotation[2,1]*N[i,1]+rotation[2,2]*N[i,2]
+                M_out[i,0], M_out[i,1], M_out[i,2] = px, py, pz
+                N_out[i,0], N_out[i,1], N_out[i,2] = nx, ny, nz
+                # Diffuse Lighting Model (same steps as shades)
+                lx, ly, lz = s[0]-px, s[1]-py, s[2]-pz
+                l_norm = np.sqrt(lx*lx+ly*ly+lz*lz)
+                n_norm = np.sqrt(nx*nx+ny*ny+nz*nz)
+                lambert = (lx/l_norm)*(nx/n_norm)+(ly/l_norm)*(ny/n_norm)+(lz/l_norm)*(nz/n_norm)
+                if lambert <= 0:
+                    continue
+                # Projection onto the 2D screen (same steps as pixels)
+                x = int(np.floor((frame_width/2)+scale_x*px))
+                y = int(np.floor((frame_height/2)-scale_y*py))
+                if 0 <= x < frame_width and 0 <= y < frame_height and lambert > M_chunks[c,y,x]:
+                    M_chunks[c,y,x] = lambert
+
+
+def step(M,N,rotations,s,frame_height,frame_width,size,zoom,out=None,jit=True,pool=None):
+    """Move illuminated points by given rotations and project them onto a 2D screen.
+    Same result as rotate, shades and pixels, in a single pass with Numba when it is installed.
 
-    return M_pixels
\ No newline at end of file
+    Args:
+        M (array[float]): Points on the surface (shape must be (n,3)).
+        N (array[float]): Normal vector at each given point on the surface (shape must be (n,3)).
+        rotations (array[rotation]): 3D rotations to be applied (must contain 1 more rotations).
+        s (array[float]): Light source position (shape must be (3,)).
+        frame_height (int): Height of the 2D screen.
+        frame_width (int): Width of the 2D screen.
+        size (float): Maximum Size of 3D object.
+        zoom (float): Zoom factor.
+        out (array[float], optional): Reusable 2D screen (shape must be (frame_height,frame_width)). Defaults to None.
+        jit (bool, optional): Use the fused kernel if Numba is installed. Defaults to True.
+        pool (dict, optional): Buffer pool for the points, normal vectors and chunk screens of the fused kernel
+            (see utils.console.buffer). Returned points are then overwritten on next call. Defaults to None.
+
+    Returns:
+        M (array[float]): Points after rotations.
+        N (array[float]): Normal vectors after rotations.
+        M_pixels (array[float]): 2D grayscale image (shape is (frame_height,frame_width)).
+    """
+    if numba is None or not jit:
+        M = rotate(M,rotations)
+        N = rotate(N,rotations)
+        lambert, light_indexes = shades(M,N,s)
+        M_pixels = pixels(M,lambert,light_indexes,frame_height,frame_width,size,zoom,out)
+        return M,N,M_pixels
+
+    # The kernel reads exactly 3 coordinates for the light source
+    assert np.shape(s) == (3,), 'Light source position must have shape (3,).'
+
+    # Compose rotations in the order they are applied
+    rotation = np.eye(3)
+    for r in rotations:
+        rotation = r.as_matrix()@rotation
+    chunks_shape = (numba.get_num_threads(),frame_height,frame_width)
+    if pool is None:
+        M_out = np.empty_like(M,dtype=float)
+        N_out = np.empty_like(N,dtype=float)
+        M_chunks = np.empty(chunks_shape)
+    else:
+        # Points and normal vectors are rotated in place once they come from the pool
+        M_out = buffer(pool,np.shape(M),name='points')
+        N_out = buffer(pool,np.shape(N),name='normals')
+        M_chunks = buffer(pool,chunks_shape,name='chunks')
+    kernel(np.ascontiguousarray(M,dtype=float),np.ascontiguousarray(N,dtype=float),
+            rotation,np.asarray(s,dtype=float),zoom*frame_width/size,zoom*frame_height/size,
+            M_out,N_out,M_chunks)
+    # Max-reduce the screens of all chunks
+    M_pixels = np.max(M_chunks,axis=0,out=out)
+
+    return M_out,N_out,M_pixels
\ No newline at end of file
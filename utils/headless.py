@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Headless rendering module for flying donut (no console, used for batch runs).
+
+For more information, see README.
+
+For usage, run <python3 donut.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/16"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import zlib
+import numpy as np
+
+from utils.geom import base, donut, rotations, rotate, step
+from utils.console import cells, encode
+
+
+def frames(parameters,frame_height,frame_width):
+    """Render the scene frame by frame without any console.
+
+    Args:
+        parameters (dict): Scene parameters (same keys as USER INPUTS in donut.py).
+        frame_height (int): Height of the console frame in characters.
+        frame_width (int): Width of the console frame in characters.
+
+    Yields:
+        M_pixels (array[float]): 2D grayscale image.
+        M_characters (array[str]): 2D array containing console characters.
+    """
+    p = parameters
+    X,Y,Z = base()
+    R2 = p['radius_ratio']*p['R1']
+    donut_size = 2*(p['R1']+R2)
+    cell_rows, cell_columns = cells(p['mode'])
+    image_height = cell_rows*frame_height
+    image_width = cell_columns*frame_width
+
+    # Same steps as the main loop of donut.py
+    M_donut, V_normals, _ = donut(p['R1'],R2,X,Z,p['n_theta'],Y,p['n_phi'])
+    initial_rotations = rotations(p['axis_A'],p['start_angle_A'],p['axis_B'],p['start_angle_B'])
+    M_rotated_donut = rotate(M_donut,initial_rotations)
+    V_rotated_normals = rotate(V_normals,initial_rotations)
+    movement_rotations = rotations(p['axis_A'],p['speed'],p['axis_B'],p['speed_ratio']*p['speed'])
+
+    for _ in range(p['n_frames']):
+        M_rotated_donut, V_rotated_normals, M_pixels = step(M_rotated_donut,V_rotated_normals,
+                            movement_rotations,p['spotlight'],image_height,image_width,
+                            donut_size,p['zoom'],jit=p['jit'])
+        M_characters = encode(M_pixels,p['mode'],p['char'],p['dithering'])
+
+        yield M_pixels, M_characters
+
+
+def checksum(M_characters):
+    """Compute a compact checksum of a frame.
+
+    Args:
+        M_characters (array[str]): 2D array containing console characters.
+
+    Returns:
+        checksum (int): CRC-32 of the frame.
+    """
+    return zlib.crc32(np.ascontiguousarray(M_characters).tobytes())
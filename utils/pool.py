@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+""" Buffer pool module for flying donut (arrays reused between frames).
+
+For more information, see README.
+
+For usage, run <python3 donut.py>.
+
+Project can be found here <https://github.com/ingranys/flying-donut>.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+__author__ = "ingranys"
+__contact__ = "ingranys@protonmail.com"
+__copyright__ = "Copyright 2021, Mustapha Gaies, Toulouse (France)"
+__date__ = "2021/01/16"
+__deprecated__ = False
+__email__ =  "ingranys@protonmail.com"
+__license__ = "GPLv3"
+__maintainer__ = None
+__status__ = "Production"
+__version__ = "0.1.0"
+
+
+import numpy
+
+
+def buffer(pool,shape,dtype=float,size=16,name=None):
+    """Get a reusable array from a size-keyed pool.
+    Arrays are only allocated the first time a shape is requested, least recently
+    used arrays are dropped when the pool is full. Content is not initialized.
+
+    Args:
+        pool (dict): Buffer pool (empty dictionary to start with).
+        shape (tuple(int)): Array shape.
+        dtype (dtype, optional): Array data type. Defaults to float.
+        size (int, optional): Maximum number of arrays in the pool. Defaults to 16.
+        name (str, optional): Tell apart arrays used at the same time with the same shape. Defaults to None.
+
+    Returns:
+        array (array): Array from the pool.
+    """
+    key = (name,tuple(shape),numpy.dtype(dtype).str)
+    if key in pool:
+        # Move array to the end (dictionaries keep insertion order)
+        pool[key] = pool.pop(key)
+    else:
+        pool[key] = numpy.empty(shape,dtype)
+        if len(pool) > size:
+            del pool[next(iter(pool))]
+
+    return pool[key]